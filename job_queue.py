@@ -0,0 +1,193 @@
+"""
+File d'attente SQLite pour la correction distribuée.
+
+Le coordinateur (main.py) y dépose une tâche par remise ; des workers, sur
+d'autres machines ou conteneurs partageant le même dossier, réclament les
+tâches, les corrigent et y déposent le résultat. Une tâche dont le worker ne
+donne plus signe de vie (bail expiré) est remise en file, jusqu'à
+MAX_ATTEMPTS tentatives.
+
+Chaque tâche appartient à une « run » (un coordinateur, identifié par son
+dossier de remises) : plusieurs coordinateurs peuvent partager la même base
+sans effacer les tâches des autres. Chaque tâche porte aussi l'empreinte de
+la configuration de correction ; un worker ne réclame que les tâches dont
+l'empreinte est identique à la sienne.
+
+Les résultats (SubmissionResult) sont stockés avec pickle : la file ne doit
+être partagée qu'entre machines de confiance.
+"""
+import json
+import pickle
+import sqlite3
+import time
+from contextlib import contextmanager
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS grading_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run TEXT NOT NULL,
+    job_key TEXT NOT NULL,
+    config TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    worker TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    heartbeat REAL,
+    result BLOB,
+    error TEXT,
+    UNIQUE (run, job_key)
+)
+"""
+
+
+class GradingQueue:
+    """SQLite-backed job queue shared by the coordinator and the workers."""
+
+    def __init__(self, db_path, lease_timeout=120, max_attempts=3):
+        self.db_path = db_path
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+        with self._connect() as conn:
+            conn.execute(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """
+        Ouvre une connexion dédiée (jamais partagée entre threads), validée
+        en sortie de bloc (annulée en cas d'exception) puis fermée.
+        """
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def reset(self, run):
+        """Remove every job of a run (other runs sharing the base are untouched)."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM grading_jobs WHERE run=?", (run,))
+
+    def enqueue(self, run, job_key, payload, config):
+        """
+        Add a job to a run (or put it back to pending if the key already
+        exists). `config` is the grading configuration fingerprint.
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO grading_jobs (run, job_key, config, payload, status) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(run, job_key) DO UPDATE SET config=excluded.config, "
+                "payload=excluded.payload, status=excluded.status, worker=NULL, "
+                "attempts=0, heartbeat=NULL, result=NULL, error=NULL",
+                (run, job_key, config, json.dumps(payload), PENDING),
+            )
+
+    def _expire_stale(self, conn):
+        """Requeue jobs whose worker stopped heartbeating, or fail them."""
+        deadline = time.time() - self.lease_timeout
+        conn.execute(
+            "UPDATE grading_jobs SET status=?, error='worker perdu (bail expiré)' "
+            "WHERE status=? AND heartbeat < ? AND attempts >= ?",
+            (FAILED, RUNNING, deadline, self.max_attempts),
+        )
+        conn.execute(
+            "UPDATE grading_jobs SET status=?, worker=NULL "
+            "WHERE status=? AND heartbeat < ?",
+            (PENDING, RUNNING, deadline),
+        )
+
+    def claim(self, worker_id, config):
+        """
+        Réclame la prochaine tâche en attente dont la configuration de
+        correction a l'empreinte `config` (toutes runs confondues).
+        Retourne (job_id, payload) ou None si rien n'est disponible.
+        """
+        with self._connect() as conn:
+            # verrou d'écriture immédiat : deux workers ne réclament jamais la même tâche
+            conn.execute("BEGIN IMMEDIATE")
+            self._expire_stale(conn)
+            row = conn.execute(
+                "SELECT id, payload FROM grading_jobs WHERE status=? AND config=? "
+                "ORDER BY id LIMIT 1",
+                (PENDING, config),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE grading_jobs SET status=?, worker=?, attempts=attempts+1, "
+                "heartbeat=? WHERE id=?",
+                (RUNNING, worker_id, time.time(), row[0]),
+            )
+        return row[0], json.loads(row[1])
+
+    def heartbeat(self, job_id, worker_id):
+        """Extend the lease of a job. Return False if this worker lost the lease."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE grading_jobs SET heartbeat=? WHERE id=? AND worker=? AND status=?",
+                (time.time(), job_id, worker_id, RUNNING),
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id, worker_id, result):
+        """
+        Store the result of a job. Return False (result ignored) if the lease
+        was lost meanwhile.
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE grading_jobs SET status=?, result=? WHERE id=? AND worker=? AND status=?",
+                (DONE, pickle.dumps(result), job_id, worker_id, RUNNING),
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id, worker_id, error, retry=True):
+        """
+        Record a failed attempt; requeue it unless out of attempts or retry is
+        False. Return False (nothing recorded) if the lease was lost meanwhile.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT attempts FROM grading_jobs WHERE id=? AND worker=? AND status=?",
+                (job_id, worker_id, RUNNING),
+            ).fetchone()
+            if row is None:
+                return False
+            status = PENDING if retry and row[0] < self.max_attempts else FAILED
+            conn.execute(
+                "UPDATE grading_jobs SET status=?, worker=NULL, error=? WHERE id=?",
+                (status, error, job_id),
+            )
+        return True
+
+    def counts(self, run):
+        """Return the number of jobs per status in a run."""
+        with self._connect() as conn:
+            self._expire_stale(conn)
+            rows = conn.execute(
+                "SELECT status, COUNT(*) FROM grading_jobs WHERE run=? GROUP BY status",
+                (run,),
+            ).fetchall()
+        counts = {PENDING: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def finished_jobs(self, run):
+        """Return (payload, status, result, error) for every finished job of a run, by key."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT payload, status, result, error FROM grading_jobs "
+                "WHERE run=? AND status IN (?, ?) ORDER BY job_key",
+                (run, DONE, FAILED),
+            ).fetchall()
+        return [
+            (json.loads(payload), status,
+             pickle.loads(result) if result is not None else None, error)
+            for payload, status, result, error in rows
+        ]
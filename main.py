@@ -12,8 +12,20 @@ import py_compile
 from datetime import datetime
 import csv
 import sys
-
-from utils import UnzipError, CopyError
+import hashlib
+import json
+import socket
+import sqlite3
+import threading
+import time
+
+from job_queue import GradingQueue
+from results import (
+    ExerciseResult, OutputExcerpt, SubmissionResult,
+    TESTS_FILE_MISSING, TESTS_NO_MAPPING, TESTS_RAN,
+)
+from utils import UnzipError, CopyError, is_submission_zip
+from watcher import SubmissionWatcher
 
 # ----- Configuration: edit these -----
 # chemin du dossier contenant les zip des étudiants
@@ -54,15 +66,35 @@ PYTHON_EXE = sys.executable
 TIMEOUT_PER_RUN = 20    # secondes pour tenter d'exécuter un exercice
 TIMEOUT_PER_TEST = 30   # secondes pour exécuter pytest sur un test
 CLEANUP_WORKDIR = False  # False pour garder les dossiers temporaires (débogage)
+LOG_OUTPUT_LIMIT = 4000  # caractères de sortie (stderr) conservés par exercice dans les logs
 
 _STDIN_NEWLINES = 1
 
-# if the csv file already exists, overwrite it
-if os.path.exists(CSV_FILE):
-    try:
-        os.remove(CSV_FILE)
-    except OSError as e:
-        print(f"Échec suppression ancien CSV {CSV_FILE} : {e}")
+# Correction distribuée (optionnel) : main() devient coordinateur et dépose
+# une tâche par remise dans QUEUE_DB ; les workers (`python main.py worker`,
+# lancés sur d'autres machines / conteneurs qui voient les mêmes dossiers)
+# corrigent les remises et renvoient les résultats.
+# Les tâches de chaque coordinateur sont isolées par dossier de remises ; un
+# worker ne prend que les tâches dont la configuration de correction (tests,
+# points, pondérations, délais) est identique à la sienne : plusieurs travaux
+# peuvent donc partager QUEUE_DB, mais il faut des workers lancés avec la
+# configuration de chacun.
+DISTRIBUTED = False
+QUEUE_DB = "file_correction.sqlite"
+LEASE_TIMEOUT = 120      # secondes sans signe de vie avant de relancer une tâche
+MAX_ATTEMPTS = 3         # tentatives par remise (perte de worker comprise)
+QUEUE_POLL_INTERVAL = 2  # secondes entre deux consultations de la file
+WORKER_IDLE_EXIT = 60    # un worker s'arrête après ce délai sans tâche
+# si des tâches attendent sans qu'aucune ne soit en cours pendant ce délai
+# (aucun worker vivant), le coordinateur les corrige lui-même
+COORDINATOR_FALLBACK_DELAY = 90
+
+# Mode surveillance (ou `python main.py watch`) : corrige chaque zip dès qu'il
+# apparaît ou change dans PATH_ASSIGNMENTS, et met à jour CSV et logs au fur
+# et à mesure. Arrêt avec Ctrl+C.
+WATCH_MODE = False
+WATCH_POLL_INTERVAL = 2  # secondes entre deux vérifications du dossier
+WATCH_SETTLE_DELAY = 1   # un zip doit rester inchangé ce délai avant correction
 
 # ----- End Configuration -----
 
@@ -430,122 +462,179 @@ def copy_data_files(student_code_folder, log_lines):
             )
 
 
-def _check_execution(ex_num, script_path, max_points, log_lines, grade_lines):
-    """Check syntax/execution and return awarded points and execution result."""
+def _check_execution(ex_result, script_path):
+    """Check syntax/execution and record the awarded points in ex_result."""
+    start = time.perf_counter()
     run_res = run_student_script_syntax_and_input_tolerant(script_path)
+    ex_result.run_duration = time.perf_counter() - start
+    ex_result.ran_ok = run_res["ran_ok"]
+    ex_result.run_returncode = run_res["returncode"]
     if run_res["ran_ok"]:
-        run_awarded = RUN_WEIGHT * max_points
-        log_lines.append(
-            f"[EX{ex_num}] Vérification exécution OK "
-            f"(returncode {run_res['returncode']}).\n"
-        )
+        ex_result.run_awarded = RUN_WEIGHT * ex_result.max_points
     else:
-        run_awarded = 0.0
-        log_lines.append(
-            f"[EX{ex_num}] Vérification exécution ÉCHEC. "
-            f"returncode={run_res['returncode']}; stderr:\n{run_res['stderr']}\n"
-        )
-    grade_lines.append(
-        f"\n - Vérification exécution : "
-        f"{'OK' if run_res['ran_ok'] else 'ÉCHEC'} "
-        f"(attribué {run_awarded:.2f}/{RUN_WEIGHT*max_points:.2f})"
-    )
-    return run_awarded, run_res
-
+        ex_result.run_error = OutputExcerpt.from_text(run_res["stderr"], LOG_OUTPUT_LIMIT)
 
-def _run_tests(ex_num, test_name, student_code_folder, max_points, logs):
-    """Run tests for an exercise and return awarded points."""
-    log_lines, grade_lines = logs["log_lines"], logs["grade_lines"]
 
-    if not test_name:
-        log_lines.append(
-            f"[EX{ex_num}] Pas de mapping de test pour l'exercice {ex_num} ; "
-            f"0 pour les tests.\n"
-        )
-        grade_lines.append("\n - Tests : pas de mapping (0 attribué)")
-        return 0.0
+def _run_tests(ex_result, student_code_folder):
+    """Run tests for an exercise and record counts and awarded points in ex_result."""
+    if not ex_result.test_name:
+        ex_result.test_status = TESTS_NO_MAPPING
+        return
 
-    test_path_in_student = os.path.join(student_code_folder, test_name)
+    test_path_in_student = os.path.join(student_code_folder, ex_result.test_name)
     if not os.path.exists(test_path_in_student):
-        log_lines.append(
-            f"[EX{ex_num}] Pas de fichier de test {test_name} dans workdir ; "
-            f"0 pour les tests.\n"
-        )
-        grade_lines.append("\n - Tests : fichier de test absent (0 attribué)")
-        return 0.0
+        ex_result.test_status = TESTS_FILE_MISSING
+        return
 
+    start = time.perf_counter()
     test_res = run_pytest_on_testfile(
-        test_name, cwd=student_code_folder, timeout=TIMEOUT_PER_TEST
-    )
-    log_lines.append(
-        f"[EX{ex_num}] Sortie stderr des tests :\n{test_res['stderr']}\n"
+        ex_result.test_name, cwd=student_code_folder, timeout=TIMEOUT_PER_TEST
     )
+    ex_result.test_duration = time.perf_counter() - start
+    ex_result.test_status = TESTS_RAN
+    ex_result.passed = test_res["passed"]
+    ex_result.failed = test_res["failed"]
+    ex_result.skipped = test_res["skipped"]
+    ex_result.total = test_res["total"]
+    ex_result.test_output = OutputExcerpt.from_text(test_res["stderr"], LOG_OUTPUT_LIMIT)
 
     fraction = test_res["passed"] / test_res["total"] if test_res["total"] > 0 else (
         1.0 if test_res["ok"] else 0.0
     )
-    test_awarded = TEST_WEIGHT * max_points * fraction
-    grade_lines.append(
-        f"\n - Tests : {test_res['passed']}/{test_res['total']} réussis -> "
-        f"attribué {test_awarded:.2f}/{TEST_WEIGHT*max_points:.2f}"
-    )
-    log_lines.append(
-        f"[Exercice{ex_num}] parsed: passed={test_res['passed']}, "
-        f"failed={test_res['failed']}, total={test_res['total']}\n"
-    )
-    return test_awarded
-def grade_exercise(ex_num, student_code_folder, student_py_files, log_lines, grade_lines):
-    """Grade a single exercise and return the score awarded."""
-    ex_name = f"exercice{ex_num}.py"
-    test_name = TEST_FILES[ex_num - 1] if ex_num - 1 < len(TEST_FILES) else None
-    max_points = EXERCISE_POINTS.get(ex_num, 0)
+    ex_result.test_awarded = TEST_WEIGHT * ex_result.max_points * fraction
 
-    grade_lines.append(f"\nExercice {ex_num} (max {max_points} pts) :")
+
+def grade_exercise(ex_num, student_code_folder, student_py_files):
+    """Grade a single exercise and return its ExerciseResult."""
+    ex_name = f"exercice{ex_num}.py"
+    ex_result = ExerciseResult(
+        ex_num=ex_num,
+        max_points=EXERCISE_POINTS.get(ex_num, 0),
+        test_name=TEST_FILES[ex_num - 1] if ex_num - 1 < len(TEST_FILES) else None,
+    )
 
     # Check if student provided the file
-    if ex_name not in student_py_files:
-        grade_lines.append(
-            f"\n - Fichier manquant : {ex_name} -> 0/{max_points}\n"
-        )
-        log_lines.append(f"[EX{ex_num}] Fichier manquant {ex_name}\n")
-        grade_lines.append(
-            f"   exécution: 0.00, tests: 0.00, manuel: 0.00 => 0.00/{max_points}\n"
-        )
-        return 0.0, max_points
+    ex_result.file_present = ex_name in student_py_files
+    if not ex_result.file_present:
+        return ex_result
 
     # Check syntax/execution
-    script_path = os.path.join(student_code_folder, ex_name)
-    run_awarded, run_res = _check_execution(
-        ex_num, script_path, max_points, log_lines, grade_lines
-    )
+    _check_execution(ex_result, os.path.join(student_code_folder, ex_name))
 
     # Run tests
-    logs = {"log_lines": log_lines, "grade_lines": grade_lines}
-    test_awarded = _run_tests(
-        ex_num, test_name, student_code_folder, max_points, logs
-    )
+    _run_tests(ex_result, student_code_folder)
 
     # Manual portion - only award if code compiles
-    if run_res["ran_ok"]:
-        manual_awarded = MANUAL_WEIGHT * max_points
-    else:
-        manual_awarded = 0.0
-        log_lines.append(
-            f"[EX{ex_num}] Pas de points de qualité : code ne compile pas.\n"
+    if ex_result.ran_ok:
+        ex_result.manual_awarded = MANUAL_WEIGHT * ex_result.max_points
+
+    return ex_result
+
+
+def _render_exercise_grade(ex_result):
+    """Render the grade.txt lines of one exercise."""
+    ex_num, max_points = ex_result.ex_num, ex_result.max_points
+    lines = [f"\nExercice {ex_num} (max {max_points} pts) :"]
+
+    if not ex_result.file_present:
+        lines.append(f"\n - Fichier manquant : exercice{ex_num}.py -> 0/{max_points}\n")
+        lines.append(
+            f"   exécution: 0.00, tests: 0.00, manuel: 0.00 => 0.00/{max_points}\n"
         )
+        return lines
 
-    # Total for this exercise
-    awarded = run_awarded + test_awarded + manual_awarded
-    grade_lines.append(
+    lines.append(
+        f"\n - Vérification exécution : "
+        f"{'OK' if ex_result.ran_ok else 'ÉCHEC'} "
+        f"(attribué {ex_result.run_awarded:.2f}/{RUN_WEIGHT*max_points:.2f})"
+    )
+    if ex_result.test_status == TESTS_NO_MAPPING:
+        lines.append("\n - Tests : pas de mapping (0 attribué)")
+    elif ex_result.test_status == TESTS_FILE_MISSING:
+        lines.append("\n - Tests : fichier de test absent (0 attribué)")
+    else:
+        lines.append(
+            f"\n - Tests : {ex_result.passed}/{ex_result.total} réussis -> "
+            f"attribué {ex_result.test_awarded:.2f}/{TEST_WEIGHT*max_points:.2f}"
+        )
+    lines.append(
         f"\n - Qualité du code et commentaires du code (attribué) : "
-        f"{manual_awarded:.2f}"
+        f"{ex_result.manual_awarded:.2f}"
     )
-    grade_lines.append(
+    lines.append(
         f"\n => Exercice {ex_num} total attribué : "
-        f"{awarded:.2f}/{max_points}\n"
+        f"{ex_result.awarded:.2f}/{max_points}\n"
     )
+    return lines
+
+
+def _render_exercise_log(ex_result):
+    """Render the log lines of one exercise."""
+    ex_num = ex_result.ex_num
+    if not ex_result.file_present:
+        return [f"[EX{ex_num}] Fichier manquant exercice{ex_num}.py\n"]
+
+    lines = []
+    if ex_result.ran_ok:
+        lines.append(
+            f"[EX{ex_num}] Vérification exécution OK "
+            f"(returncode {ex_result.run_returncode}, {ex_result.run_duration:.1f}s).\n"
+        )
+    else:
+        lines.append(
+            f"[EX{ex_num}] Vérification exécution ÉCHEC. "
+            f"returncode={ex_result.run_returncode} ({ex_result.run_duration:.1f}s); "
+            f"stderr:\n"
+            f"{ex_result.run_error.render() if ex_result.run_error else ''}\n"
+        )
 
-    return awarded, max_points
+    if ex_result.test_status == TESTS_NO_MAPPING:
+        lines.append(
+            f"[EX{ex_num}] Pas de mapping de test pour l'exercice {ex_num} ; "
+            f"0 pour les tests.\n"
+        )
+    elif ex_result.test_status == TESTS_FILE_MISSING:
+        lines.append(
+            f"[EX{ex_num}] Pas de fichier de test {ex_result.test_name} dans workdir ; "
+            f"0 pour les tests.\n"
+        )
+    else:
+        lines.append(
+            f"[EX{ex_num}] Sortie stderr des tests :\n{ex_result.test_output.render()}\n"
+        )
+        lines.append(
+            f"[Exercice{ex_num}] parsed: passed={ex_result.passed}, "
+            f"failed={ex_result.failed}, total={ex_result.total} "
+            f"({ex_result.test_duration:.1f}s)\n"
+        )
+
+    if not ex_result.ran_ok:
+        lines.append(
+            f"[EX{ex_num}] Pas de points de qualité : code ne compile pas.\n"
+        )
+    return lines
+
+
+def render_grade_lines(result):
+    """Render the grade.txt content of a SubmissionResult, as a list of lines."""
+    grade_lines = [f"Correction de la soumission : {result.folder2}\n"]
+    for ex_result in result.exercises:
+        grade_lines.extend(_render_exercise_grade(ex_result))
+    grade_lines.append(f"\nTOTAL : {result.total_score:.2f} / {result.total_max:.2f}\n")
+    return grade_lines
+
+
+def render_log_lines(result):
+    """Render the log content of a SubmissionResult, as a list of lines."""
+    log_lines = [
+        f"Log pour la soumission {result.folder2} (créé {result.created}):\n"
+    ]
+    log_lines.extend(result.notes)
+    for ex_result in result.exercises:
+        log_lines.extend(_render_exercise_log(ex_result))
+    log_lines.extend(result.id_notes)
+    log_lines.append(f"Durée de la correction : {result.duration:.1f}s\n")
+    return log_lines
 
 
 def _write_log_files(path_assignments, extract_to, student_code_folder, log_lines, grade_lines):
@@ -582,24 +671,22 @@ def _write_csv_entry(student_ids, folder2, total_score):
         print(f"Échec écriture dans le CSV {CSV_FILE} : {e}")
 
 
-def save_results(paths, logs, folder2, total_score, student_ids):
-    """Save log and grade files, and write to CSV."""
-    _write_log_files(
-        paths["assignments"], paths["extract"], paths["student"],
-        logs["log_lines"], logs["grade_lines"]
-    )
-    _write_csv_entry(student_ids, folder2, total_score)
-
-
-def _initialize_submission(folder2):
-    """Initialize log and grade lines for a submission."""
-    log_lines = []
-    grade_lines = []
-    grade_lines.append(f"Correction de la soumission : {folder2}\n")
-    log_lines.append(
-        f"Log pour la soumission {folder2} (créé {datetime.now().isoformat()}):\n"
-    )
-    return log_lines, grade_lines
+def _rewrite_csv(entries):
+    """
+    Réécrit entièrement le CSV à partir de {clé: (matricules, note)}.
+    Passe par un fichier temporaire pour qu'un lecteur ne voie jamais un CSV partiel.
+    """
+    tmp_path = f"{CSV_FILE}.tmp"
+    try:
+        with open(tmp_path, "w", newline='', encoding="utf-8") as csvfile:
+            csvwriter = csv.writer(csvfile)
+            for key in sorted(entries):
+                student_ids, total_score = entries[key]
+                for student_id in student_ids:
+                    csvwriter.writerow([student_id, f"{total_score:.2f}"])
+        os.replace(tmp_path, CSV_FILE)
+    except (IOError, OSError) as e:
+        print(f"Échec écriture dans le CSV {CSV_FILE} : {e}")
 
 
 def _setup_student_environment(extract_to, path_test_cases, log_lines):
@@ -617,9 +704,18 @@ def _setup_student_environment(extract_to, path_test_cases, log_lines):
     return student_code_folder, student_py_files
 
 
-def process_submission(zip_file_path, folder_path, folder2, path_assignments, path_test_cases):
-    """Process a single student submission."""
-    extract_to = os.path.join(folder_path, folder2[:-4])
+def extract_path(folder_path, folder2):
+    """Return the folder a submission zip is extracted to."""
+    return os.path.join(folder_path, folder2[:-4])
+
+
+def grade_submission(zip_file_path, folder_path, folder2, path_test_cases):
+    """
+    Décompresse et corrige une remise sans rien écrire dans les logs ni le CSV.
+    Retourne un SubmissionResult, ou None si la décompression échoue.
+    """
+    start = time.perf_counter()
+    extract_to = extract_path(folder_path, folder2)
 
     # Unzip
     try:
@@ -627,45 +723,298 @@ def process_submission(zip_file_path, folder_path, folder2, path_assignments, pa
         print(f"Décompressé {zip_file_path} -> {extract_to}")
     except UnzipError as e:
         print(f"Échec de la décompression {zip_file_path} : {e}")
-        return
+        return None
 
     # Initialize
-    log_lines, grade_lines = _initialize_submission(folder2)
+    result = SubmissionResult(
+        folder2=folder2, extract_to=extract_to, created=datetime.now().isoformat()
+    )
 
     # Setup environment
-    student_code_folder, student_py_files = _setup_student_environment(
-        extract_to, path_test_cases, log_lines
+    result.student_code_folder, student_py_files = _setup_student_environment(
+        extract_to, path_test_cases, result.notes
     )
 
     # Grade all exercises
-    total_score = 0.0
-
     for ex_num in range(1, len(TEST_FILES) + 1):
-        total_score += grade_exercise(
-            ex_num, student_code_folder, student_py_files, log_lines, grade_lines
-        )[0]
+        result.exercises.append(
+            grade_exercise(ex_num, result.student_code_folder, student_py_files)
+        )
 
-    # Add total summary
-    total_max = sum(EXERCISE_POINTS.get(i, 0) for i in range(1, len(TEST_FILES) + 1))
-    grade_lines.append(f"\nTOTAL : {total_score:.2f} / {total_max:.2f}\n")
+    result.student_ids = sorted(resolve_student_ids(
+        folder2, extract_to, result.student_code_folder, result.id_notes
+    ))
+    result.duration = time.perf_counter() - start
+    return result
 
-    student_ids = resolve_student_ids(
-        folder2, extract_to, student_code_folder, log_lines
+
+def write_result_files(result, path_assignments):
+    """Render a SubmissionResult and write its log and grade.txt."""
+    _write_log_files(
+        path_assignments, result.extract_to, result.student_code_folder,
+        render_log_lines(result), render_grade_lines(result)
     )
 
-    # Save results
-    paths = {
-        "assignments": path_assignments,
-        "extract": extract_to,
-        "student": student_code_folder
+
+def save_submission_result(result, path_assignments):
+    """Save the log, grade.txt and CSV rows of a SubmissionResult."""
+    write_result_files(result, path_assignments)
+    _write_csv_entry(result.student_ids, result.folder2, result.total_score)
+
+
+def process_submission(zip_file_path, folder_path, folder2, path_assignments, path_test_cases):
+    """Process a single student submission."""
+    result = grade_submission(zip_file_path, folder_path, folder2, path_test_cases)
+    if result is not None:
+        save_submission_result(result, path_assignments)
+
+
+def iter_submissions(path_assignments):
+    """Yield (zip_file_path, folder_path, folder2) for every submission zip."""
+    for folder in os.listdir(path_assignments):
+        folder_path = os.path.join(path_assignments, folder)
+        if not os.path.isdir(folder_path):
+            continue
+
+        for folder2 in os.listdir(folder_path):
+            if not is_submission_zip(folder2):
+                continue
+
+            yield os.path.join(folder_path, folder2), folder_path, folder2
+
+
+# ---------------- correction distribuée ----------------
+
+def grading_config_id():
+    """
+    Empreinte des réglages qui influencent la note (tests et leur contenu,
+    points, pondérations, délais) : deux processus de même empreinte
+    corrigent une remise de la même façon.
+    """
+    tests = {}
+    for testfile in TEST_FILES:
+        try:
+            with open(os.path.join(PATH_TEST_CASES_DIR, testfile), "rb") as f:
+                tests[testfile] = hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            tests[testfile] = None
+    config = {
+        "test_files": TEST_FILES,
+        "tests": tests,
+        "exercise_points": EXERCISE_POINTS,
+        "weights": [RUN_WEIGHT, TEST_WEIGHT, MANUAL_WEIGHT],
+        "timeouts": [TIMEOUT_PER_RUN, TIMEOUT_PER_TEST],
+        "log_output_limit": LOG_OUTPUT_LIMIT,
     }
-    logs = {"log_lines": log_lines, "grade_lines": grade_lines}
-    save_results(paths, logs, folder2, total_score, student_ids)
+    encoded = json.dumps(config, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def _open_queue():
+    """Open the shared grading queue using the configured lease settings."""
+    return GradingQueue(
+        QUEUE_DB, lease_timeout=LEASE_TIMEOUT, max_attempts=MAX_ATTEMPTS
+    )
+
+
+def run_coordinator(path_assignments, path_test_cases):
+    """
+    Dépose une tâche par remise dans la file, attend que les workers les
+    aient toutes traitées, puis écrit logs, grade.txt et un seul CSV agrégé.
+    """
+    queue = _open_queue()
+    # seules les tâches de ce dossier de remises sont remplacées
+    run = os.path.abspath(path_assignments)
+    config_id = grading_config_id()
+    queue.reset(run)
+    for zip_file_path, folder_path, folder2 in iter_submissions(path_assignments):
+        queue.enqueue(run, zip_file_path, {
+            "zip_file_path": zip_file_path,
+            "folder_path": folder_path,
+            "folder2": folder2,
+            "path_test_cases": path_test_cases,
+        }, config_id)
+    print(f"Configuration de correction {config_id} (les workers doivent avoir la même).")
+
+    coordinator_id = f"{socket.gethostname()}-{os.getpid()}-coordinateur"
+    last_counts = None
+    idle_since = time.monotonic()
+    while True:
+        counts = queue.counts(run)
+        if counts != last_counts:
+            print(
+                f"File : {counts['pending']} en attente, {counts['running']} en cours, "
+                f"{counts['done']} terminées, {counts['failed']} en échec"
+            )
+            last_counts = counts
+        if counts["pending"] == 0 and counts["running"] == 0:
+            break
+        if counts["running"] > 0:
+            idle_since = time.monotonic()
+        elif time.monotonic() - idle_since >= COORDINATOR_FALLBACK_DELAY:
+            # personne ne prend les tâches : on les corrige localement
+            job = queue.claim(coordinator_id, config_id)
+            if job is not None:
+                print(f"Aucun worker actif : correction locale de {job[1]['zip_file_path']}")
+                _process_job(queue, coordinator_id, job)
+            continue
+        time.sleep(QUEUE_POLL_INTERVAL)
+
+    for payload, status, result, error in queue.finished_jobs(run):
+        if status == "done" and result is not None:
+            save_submission_result(result, path_assignments)
+        else:
+            print(f"Remise non corrigée {payload['zip_file_path']} : {error}")
+
+
+def _heartbeat_loop(queue, job_id, worker_id, stop):
+    """Renew a job's lease until the stop event is set or the lease is lost."""
+    while not stop.wait(LEASE_TIMEOUT / 3):
+        try:
+            if not queue.heartbeat(job_id, worker_id):
+                print(f"Bail perdu pour la tâche {job_id} : elle a été reprise ailleurs.")
+                return
+        except sqlite3.Error as e:
+            # base verrouillée (stockage partagé lent...) : on réessaie au prochain tour
+            print(f"Échec renouvellement du bail de la tâche {job_id} : {e}")
+
+
+def _process_job(queue, worker_id, job):
+    """Grade a claimed job while renewing its lease, then report the outcome."""
+    job_id, payload = job
+    stop = threading.Event()
+    heartbeat = threading.Thread(
+        target=_heartbeat_loop, args=(queue, job_id, worker_id, stop), daemon=True
+    )
+    heartbeat.start()
+    try:
+        result = grade_submission(
+            payload["zip_file_path"], payload["folder_path"],
+            payload["folder2"], payload["path_test_cases"]
+        )
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        # on rend la tâche à la file plutôt que de perdre la remise
+        kept = queue.fail(job_id, worker_id, f"{type(e).__name__}: {e}")
+    else:
+        if result is None:
+            kept = queue.fail(job_id, worker_id, "décompression impossible", retry=False)
+        else:
+            kept = queue.complete(job_id, worker_id, result)
+    finally:
+        stop.set()
+        heartbeat.join()
+
+    if not kept:
+        # un autre worker a repris la tâche : on ne touche plus à son dossier
+        print(
+            f"Bail perdu pour {payload['zip_file_path']} : résultat ignoré, "
+            f"la remise est corrigée par un autre worker."
+        )
+
+
+def run_worker():
+    """
+    Réclame et corrige des remises depuis la file jusqu'à ce qu'elle reste
+    vide pendant WORKER_IDLE_EXIT secondes.
+    """
+    queue = _open_queue()
+    worker_id = f"{socket.gethostname()}-{os.getpid()}"
+    config_id = grading_config_id()
+    print(f"Worker {worker_id} démarré (file {QUEUE_DB}, configuration {config_id}).")
+
+    idle_since = time.monotonic()
+    while time.monotonic() - idle_since < WORKER_IDLE_EXIT:
+        job = queue.claim(worker_id, config_id)
+        if job is None:
+            time.sleep(QUEUE_POLL_INTERVAL)
+            continue
+
+        _process_job(queue, worker_id, job)
+        idle_since = time.monotonic()
+
+    print(f"Worker {worker_id} : file vide, arrêt.")
+
+
+# ---------------- mode surveillance ----------------
+
+def _watch_grade_zip(zip_file_path, path_assignments, path_test_cases, csv_entries):
+    """Grade one new or changed zip, write its files and update its CSV entry."""
+    folder_path, folder2 = os.path.split(zip_file_path)
+    # une remise modifiée est redécompressée dans un dossier propre,
+    # à condition qu'il soit bien un sous-dossier de la section
+    extract_to = os.path.normpath(extract_path(folder_path, folder2))
+    if os.path.dirname(extract_to) != os.path.normpath(folder_path):
+        print(f"Nom de remise invalide ignoré : {zip_file_path}")
+        return
+    if os.path.isdir(extract_to):
+        shutil.rmtree(extract_to, ignore_errors=True)
+
+    result = grade_submission(zip_file_path, folder_path, folder2, path_test_cases)
+    if result is None:
+        csv_entries.pop(zip_file_path, None)
+        return
+
+    write_result_files(result, path_assignments)
+    csv_entries[zip_file_path] = (result.student_ids, result.total_score)
+    print(f"Corrigé {zip_file_path} : {result.total_score:.2f}")
+    if not result.student_ids:
+        print(
+            f"Aucun numéro d'étudiant trouvé dans le nom du dossier "
+            f"{folder2} pour le CSV."
+        )
+
+
+def run_watch(path_assignments, path_test_cases):
+    """
+    Corrige les remises au fil de l'eau : chaque zip nouveau ou modifié est
+    corrigé seul, puis son log, son grade.txt et ses lignes du CSV sont mis à jour.
+    """
+    watcher = SubmissionWatcher(
+        path_assignments,
+        poll_interval=WATCH_POLL_INTERVAL,
+        settle_delay=WATCH_SETTLE_DELAY,
+    )
+    detection = "inotify" if watcher.uses_inotify else "scrutation périodique"
+    print(f"Surveillance de {path_assignments} ({detection}). Ctrl+C pour arrêter.")
+
+    csv_entries = {}
+    try:
+        while True:
+            try:
+                changed, removed = watcher.changed()
+            except OSError as e:
+                # dossier déplacé / supprimé pendant le parcours : on réessaie
+                print(f"Échec du parcours de {path_assignments} : {e}")
+                time.sleep(WATCH_POLL_INTERVAL)
+                continue
+
+            if removed:
+                for zip_file_path in removed:
+                    if csv_entries.pop(zip_file_path, None) is not None:
+                        print(f"Remise supprimée, retirée du CSV : {zip_file_path}")
+                _rewrite_csv(csv_entries)
+
+            for zip_file_path in changed:
+                try:
+                    _watch_grade_zip(
+                        zip_file_path, path_assignments, path_test_cases, csv_entries
+                    )
+                except Exception as e:  # pylint: disable=broad-exception-caught
+                    # une remise illisible (zip chiffré...) n'arrête pas la surveillance
+                    print(
+                        f"Échec de la correction de {zip_file_path} : "
+                        f"{type(e).__name__}: {e}"
+                    )
+                    csv_entries.pop(zip_file_path, None)
+                # CSV à jour après chaque remise, pas seulement en fin de lot
+                _rewrite_csv(csv_entries)
+    except KeyboardInterrupt:
+        print("Surveillance arrêtée.")
 
 
 # ---------------- main ----------------
 
-def main():
+def main(watch=WATCH_MODE):
     """Main function to process student assignments and generate grades."""
     path_assignments = PATH_ASSIGNMENTS
     path_test_cases = PATH_TEST_CASES_DIR
@@ -675,16 +1024,20 @@ def main():
     if not os.path.isdir(path_test_cases):
         raise RuntimeError(f"Le dossier des tests n'existe pas : {path_test_cases}")
 
-    for folder in os.listdir(path_assignments):
-        folder_path = os.path.join(path_assignments, folder)
-        if not os.path.isdir(folder_path):
-            continue
-
-        for folder2 in os.listdir(folder_path):
-            if not folder2.endswith(".zip"):
-                continue
-
-            zip_file_path = os.path.join(folder_path, folder2)
+    # if the csv file already exists, overwrite it
+    # (fait ici plutôt qu'à l'import pour qu'un worker n'efface pas le CSV)
+    if os.path.exists(CSV_FILE):
+        try:
+            os.remove(CSV_FILE)
+        except OSError as e:
+            print(f"Échec suppression ancien CSV {CSV_FILE} : {e}")
+
+    if watch:
+        run_watch(path_assignments, path_test_cases)
+    elif DISTRIBUTED:
+        run_coordinator(path_assignments, path_test_cases)
+    else:
+        for zip_file_path, folder_path, folder2 in iter_submissions(path_assignments):
             process_submission(
                 zip_file_path, folder_path, folder2, path_assignments, path_test_cases
             )
@@ -693,5 +1046,13 @@ def main():
 
 
 # Si exécution directe :
+#   python main.py          -> correction (locale, ou coordinateur si DISTRIBUTED)
+#   python main.py worker   -> worker de correction distribuée
+#   python main.py watch    -> mode surveillance
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1 and sys.argv[1] == "worker":
+        run_worker()
+    elif len(sys.argv) > 1 and sys.argv[1] == "watch":
+        main(watch=True)
+    else:
+        main()
@@ -0,0 +1,92 @@
+"""
+Résultats de correction sous forme de données compactes.
+
+La correction remplit ces objets ; grade.txt et les logs n'en sont rendus
+qu'au moment de l'écriture (voir main.py). Ils se sérialisent avec pickle pour
+passer d'un processus / d'une machine à l'autre (file de correction distribuée).
+"""
+from dataclasses import dataclass, field
+
+# statut des tests d'un exercice
+TESTS_RAN = "ran"
+TESTS_NO_MAPPING = "no_mapping"
+TESTS_FILE_MISSING = "file_missing"
+
+
+@dataclass(slots=True)
+class OutputExcerpt:
+    """End of a (possibly long) command output, with the original length."""
+    text: str
+    total_length: int
+
+    @classmethod
+    def from_text(cls, text, limit):
+        """Keep at most the last `limit` characters (pytest puts its summary last)."""
+        text = text or ""
+        return cls(text[len(text) - limit:] if len(text) > limit else text, len(text))
+
+    @property
+    def truncated(self):
+        """True if part of the output was dropped."""
+        return self.total_length > len(self.text)
+
+    def render(self):
+        """Return the excerpt, prefixed by a marker when it was truncated."""
+        if not self.truncated:
+            return self.text
+        dropped = self.total_length - len(self.text)
+        return f"[... {dropped} caractères tronqués ...]\n{self.text}"
+
+
+@dataclass(slots=True)
+class ExerciseResult:
+    """Grading outcome of one exercise of a submission."""
+    ex_num: int
+    max_points: int
+    file_present: bool = False
+    ran_ok: bool = False
+    run_returncode: int | None = None
+    run_error: OutputExcerpt | None = None
+    run_duration: float = 0.0
+    test_name: str | None = None
+    test_status: str = TESTS_NO_MAPPING
+    passed: int = 0
+    failed: int = 0
+    skipped: int = 0
+    total: int = 0
+    test_output: OutputExcerpt | None = None
+    test_duration: float = 0.0
+    run_awarded: float = 0.0
+    test_awarded: float = 0.0
+    manual_awarded: float = 0.0
+
+    @property
+    def awarded(self):
+        """Total points awarded for this exercise."""
+        return self.run_awarded + self.test_awarded + self.manual_awarded
+
+
+@dataclass(slots=True)
+class SubmissionResult:
+    """Grading outcome of one submission zip."""
+    folder2: str
+    extract_to: str
+    created: str
+    student_code_folder: str = ""
+    student_ids: list[int] = field(default_factory=list)
+    exercises: list[ExerciseResult] = field(default_factory=list)
+    # messages de préparation (fichiers trouvés, copies...)
+    notes: list[str] = field(default_factory=list)
+    # messages sur les matricules, affichés après les exercices
+    id_notes: list[str] = field(default_factory=list)
+    duration: float = 0.0
+
+    @property
+    def total_score(self):
+        """Points awarded over all exercises."""
+        return sum(ex.awarded for ex in self.exercises)
+
+    @property
+    def total_max(self):
+        """Maximum points over all exercises."""
+        return sum(ex.max_points for ex in self.exercises)
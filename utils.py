@@ -4,4 +4,11 @@ class UnzipError(Exception):
 
 class CopyError(Exception):
     """Custom exception for copy errors."""
-    pass
\ No newline at end of file
+    pass
+
+def is_submission_zip(name):
+    """
+    True if `name` is a submission zip whose extraction folder (name without
+    .zip) is a real sub-folder: rejects ".zip", "..zip" and "...zip".
+    """
+    return name.endswith(".zip") and name[:-4] not in ("", ".", "..")
@@ -0,0 +1,155 @@
+"""
+Surveillance du dossier des remises pour la correction au fil de l'eau.
+
+inotify (Linux, via ctypes) sert uniquement à se réveiller dès qu'un fichier
+change ; la décision « quelle remise corriger » se fait toujours en comparant
+(taille, date de modification) des zip entre deux parcours. Sans inotify, on
+se contente de parcourir le dossier toutes les poll_interval secondes.
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import time
+
+from utils import is_submission_zip
+
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_CLOEXEC = 0o2000000
+_IN_NONBLOCK = 0o4000
+_WATCH_MASK = (_IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO
+               | _IN_CREATE | _IN_DELETE)
+
+
+class _Inotify:
+    """Minimal inotify wrapper: watch directories and wait for any event."""
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = self._libc.inotify_init1(_IN_CLOEXEC | _IN_NONBLOCK)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 a échoué")
+        self._watched = set()
+
+    def watch(self, path):
+        """Add a watch on a directory (no-op if already watched)."""
+        if path in self._watched:
+            return
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), _WATCH_MASK)
+        if wd >= 0:
+            self._watched.add(path)
+
+    def forget_missing(self):
+        """Drop directories that no longer exist (the kernel removed their watch)."""
+        self._watched = {p for p in self._watched if os.path.isdir(p)}
+
+    def wait(self, timeout):
+        """Block until an event arrives or the timeout expires, then drain events."""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return
+        try:
+            while True:
+                # le contenu des événements est ignoré : on reparcourt le dossier
+                if not os.read(self._fd, 64 * 1024):
+                    return
+        except BlockingIOError:
+            return
+
+
+def _open_inotify():
+    """Return an _Inotify instance, or None when inotify is unavailable."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        return _Inotify()
+    except (OSError, AttributeError, TypeError):
+        return None
+
+
+class SubmissionWatcher:
+    """
+    Détecte les zip nouveaux ou modifiés dans path_assignments/<dossier>/.
+    Un zip n'est signalé qu'une fois stable (inchangé pendant settle_delay
+    secondes), pour ne pas corriger une archive en cours de copie.
+    """
+
+    def __init__(self, path_assignments, poll_interval=2.0, settle_delay=1.0):
+        self.path_assignments = path_assignments
+        self.poll_interval = poll_interval
+        self.settle_delay = settle_delay
+        self._seen = {}
+        self._inotify = _open_inotify()
+
+    @property
+    def uses_inotify(self):
+        """True if changes are detected with inotify rather than polling only."""
+        return self._inotify is not None
+
+    def _scan(self):
+        """Return {zip_path: (size, mtime_ns)} for every submission zip."""
+        snapshot = {}
+        if self._inotify is not None:
+            self._inotify.forget_missing()
+            self._inotify.watch(self.path_assignments)
+        for folder in os.listdir(self.path_assignments):
+            folder_path = os.path.join(self.path_assignments, folder)
+            if not os.path.isdir(folder_path):
+                continue
+            if self._inotify is not None:
+                self._inotify.watch(folder_path)
+            try:
+                names = os.listdir(folder_path)
+            except OSError:
+                # section supprimée entre les deux listdir
+                continue
+            for folder2 in names:
+                if not is_submission_zip(folder2):
+                    continue
+                zip_path = os.path.join(folder_path, folder2)
+                try:
+                    st = os.stat(zip_path)
+                except OSError:
+                    continue
+                snapshot[zip_path] = (st.st_size, st.st_mtime_ns)
+        return snapshot
+
+    def _wait(self):
+        """Sleep until something may have changed."""
+        if self._inotify is not None:
+            # le délai sert de filet de sécurité si un événement est manqué
+            self._inotify.wait(self.poll_interval)
+        else:
+            time.sleep(self.poll_interval)
+
+    def changed(self):
+        """
+        Bloque jusqu'à ce qu'au moins un zip soit nouveau ou modifié (et stable),
+        ou supprimé. Retourne (modifiés, supprimés), deux listes triées ; au
+        premier appel, tous les zip existants sont « modifiés ».
+        """
+        while True:
+            snapshot = self._scan()
+            removed = sorted(set(self._seen) - set(snapshot))
+            for zip_path in removed:
+                del self._seen[zip_path]
+            pending = {p: sig for p, sig in snapshot.items() if self._seen.get(p) != sig}
+            if not pending:
+                if removed:
+                    return [], removed
+                self._wait()
+                continue
+
+            time.sleep(self.settle_delay)
+            again = self._scan()
+            stable = sorted(p for p, sig in pending.items() if again.get(p) == sig)
+            if stable or removed:
+                for zip_path in stable:
+                    self._seen[zip_path] = pending[zip_path]
+                return stable, removed